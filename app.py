@@ -1,15 +1,30 @@
 # Run this app with `python app.py` and
 # visit http://127.0.0.1:8050/ in your web browser.
+# For production, serve it with `gunicorn app:server` instead, see `gunicorn.conf.py`.
 import os
-from dash import Dash, State, html, dcc, Input, Output, callback, ctx
+import functools
+import hashlib
+import threading
+from flask import Response, request
+from dash import Dash, State, html, dcc, Input, Output, callback, clientside_callback, ClientsideFunction, ctx, no_update
+from dash.exceptions import PreventUpdate
 import plotly.express as px
+from plotly.colors import make_colorscale
 import pandas as pd
+import numpy as np
 import json
 import chardet
 import copy
+from search import build_search_index, search
 
-debug = True
-app = Dash(__name__)
+# Production mode disables debug output and dev tools, and compresses responses (requires `flask-compress`)
+production = os.environ.get('PRODUCTION', '0') == '1'
+debug = not production
+app = Dash(__name__, compress=production)
+
+# Cache lifetime (in seconds) of the static assets and the GeoJSON served below
+STATIC_MAX_AGE = 30 * 24 * 60 * 60
+UKRAINE_GEOJSON_URL = '/geodata/ukraine.geojson'
 
 def print_debug(*args, **kwargs):
     global debug
@@ -53,41 +68,214 @@ def load_data(file_name: str) -> pd.DataFrame:
         print('Downloaded data from URL and saved to local file')
     
     data['event_date'] = pd.to_datetime(data['event_date'])
-    data['event_date_i'] = data['event_date'].apply(lambda x: int(pd.Timestamp(x).timestamp()))
+    data['event_date_i'] = (data['event_date'] - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
     return data
 
-data = load_data(default_file)
+def build_country_partitions(data: pd.DataFrame) -> dict[str, np.ndarray]:
+    """
+    Maps every country to the (sorted) row positions of its events in `data`.
+    Selecting countries then only touches their rows instead of scanning the whole dataset.
+    """
+    return data.groupby('country').indices
+
+def build_source_index(data: pd.DataFrame) -> tuple[dict, dict]:
+    """
+    Splits the semicolon separated `source` field into one entry per event and individual source.
+    Sources and sub event types are stored as the integer `key` (source code * number of sub event types
+    + sub event type code), so counting them is a `np.bincount`, see `count_events_by_source`.
+    Returns the exploded index (row position, date, key) and the number of events per
+    day, country, fatal/non-fatal and key. Both are sorted by date, so a date range is one contiguous slice.
+    """
+    sources = data['source'].reset_index(drop=True).str.split(';').explode().str.strip()
+    sources = sources[sources.notna() & (sources != '')]
+    source_codes, source_names = pd.factorize(sources)
+    sub_event_type_codes, sub_event_types = pd.factorize(data['sub_event_type'])
+    country_codes, country_names = pd.factorize(data['country'])
+
+    rows = sources.index.to_numpy()
+    dates = data['event_date_i'].to_numpy()[rows]
+    order = np.argsort(dates, kind='stable')
+    rows, dates = rows[order], dates[order]
+    keys = source_codes[order].astype(np.int64) * len(sub_event_types) + sub_event_type_codes[rows]
+    source_index = {
+        'row': rows,
+        'event_date_i': dates,
+        'key': keys,
+        'sources': np.asarray(source_names, dtype=object),
+        'sub_event_types': np.asarray(sub_event_types, dtype=object),
+    }
+
+    counts = (
+        pd.DataFrame({
+            'event_date_i': dates,
+            'country': country_codes[rows],
+            'fatal': data['fatalities'].to_numpy()[rows] > 0,
+            'key': keys,
+        })
+        .groupby(['event_date_i', 'country', 'fatal', 'key'])
+        .size()
+        .reset_index(name='count')
+    )
+    source_counts = {column: counts[column].to_numpy() for column in counts.columns}
+    source_counts['countries'] = np.asarray(country_names, dtype=object)
+    return source_index, source_counts
+
+# keys of `compute_metadata`, a sidecar file without all of them is computed again
+METADATA_KEYS = {
+    'min_timestamp', 'max_timestamp', 'slider_marks', 'event_types', 'countries',
+    'sub_event_type_color_map', 'event_type_color_map', 'country_color_map',
+}
 
-minTimestamp = int(pd.Timestamp(data['event_date'].min().date()).timestamp())
-maxTimestamp = int(pd.Timestamp(data['event_date'].max().date()).timestamp())
+def compute_metadata(data: pd.DataFrame) -> dict:
+    """
+    Computes everything the layout and the color encoding need from a dataset,
+    so the server can start without loading the dataset itself, see `load_metadata`.
+    """
+    first_of_years = data.groupby([data['event_date'].dt.year])['event_date'].min().sort_values()
+
+    # country color map
+    country_palette = px.colors.qualitative.Alphabet
+    countries = sorted(data['country'].unique().tolist())
+    country_color_map = {}
+
+    for i, country in enumerate(countries):
+        if country.lower() == 'ukraine':
+            country_color_map[country] = 'blue'
+        elif country.lower() == 'russia':
+            country_color_map[country] = 'red'
+        else:
+            country_color_map[country] = country_palette[i % len(country_palette)]
+
+    return {
+        'min_timestamp': int(pd.Timestamp(data['event_date'].min().date()).timestamp()),
+        'max_timestamp': int(pd.Timestamp(data['event_date'].max().date()).timestamp()),
+        'slider_marks': {int(pd.Timestamp(date).timestamp()): date.strftime('%Y-%m-%d') for date in first_of_years},
+        'event_types': data['event_type'].unique().tolist(),
+        'countries': countries,
+        'sub_event_type_color_map': {set: px.colors.qualitative.Prism[i % len(px.colors.qualitative.Prism)] for i, set in enumerate(sorted(data['sub_event_type'].unique().tolist()))},
+        'event_type_color_map': {et: px.colors.qualitative.Prism[i % len(px.colors.qualitative.Prism)] for i, et in enumerate(sorted(data['event_type'].unique().tolist()))},
+        'country_color_map': country_color_map,
+    }
+
+def metadata_path(file_name: str) -> str:
+    return 'data/' + os.path.splitext(file_name)[0] + '.meta.json'
+
+def write_metadata(file_name: str, data: pd.DataFrame):
+    # write to a temporary file and rename it, so other processes never read a partially written file
+    path = metadata_path(file_name)
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(compute_metadata(data), f)
+    os.replace(temp_path, path)
+
+def load_metadata(file_name: str) -> dict:
+    """
+    Reads the metadata sidecar file of `file_name`.
+    If it is missing, unreadable, incomplete or older than the dataset, the dataset is loaded to create it.
+    """
+    try:
+        if os.path.getmtime(metadata_path(file_name)) >= os.path.getmtime('data/' + file_name):
+            with open(metadata_path(file_name), 'r') as f:
+                metadata = json.load(f)
+            missing_keys = METADATA_KEYS - metadata.keys()
+            if missing_keys:
+                raise KeyError(f'missing {missing_keys}')
+            metadata['slider_marks'] = {int(timestamp): label for timestamp, label in metadata['slider_marks'].items()}
+            print_debug(f'Loaded metadata from {metadata_path(file_name)}')
+            return metadata
+    except (OSError, ValueError, KeyError, AttributeError) as e:
+        print_debug(f'Could not read metadata from {metadata_path(file_name)}: {e!r}')
+    ensure_dataset(file_name)
+    return compute_metadata(data)
+
+def set_dataset(file_name: str):
+    """
+    Loads `file_name` into the global `data` and rebuilds the indexes derived from it.
+    Callbacks read these globals without taking `dataset_lock`, so everything is built first
+    and published together, a callback never sees the new `data` with the indexes of the old one.
+    """
+    global data
+    global loaded_file
+    global loaded_mtime
+    global search_index
+    global country_partitions
+    global source_index
+    global source_counts
+    global data_filtered
+    global current_filter_state
+
+    # taken before reading, so a change while reading is picked up by the next `ensure_dataset`
+    mtime = dataset_mtime(file_name)
+    new_data = load_data(file_name)
+    if mtime is None:
+        mtime = dataset_mtime(file_name)
+    write_metadata(file_name, new_data)
+    new_search_index = build_search_index(new_data)
+    new_country_partitions = build_country_partitions(new_data)
+    new_source_index, new_source_counts = build_source_index(new_data)
+
+    data, loaded_file, loaded_mtime = new_data, file_name, mtime
+    search_index, country_partitions = new_search_index, new_country_partitions
+    source_index, source_counts = new_source_index, new_source_counts
+    # the filtered rows belong to the previous data, the next callback filters again, see `apply_filter_state`
+    data_filtered, current_filter_state = None, None
+
+def dataset_mtime(file_name: str) -> float | None:
+    try:
+        return os.path.getmtime('data/' + file_name)
+    except FileNotFoundError:
+        return None
+
+def ensure_dataset(file_name: str | None):
+    """
+    Loads `file_name` unless it is already loaded and unchanged on disk. The dataset is only loaded on first use,
+    and workers of a multi-process server each hold their own `data`,
+    so a worker may still have another dataset loaded than the one selected in the browser.
+    Comparing the modification time makes every worker pick up a changed file,
+    not only the one which served the click on the reload button.
+    """
+    file_name = file_name or loaded_file or default_file
+    with dataset_lock:
+        if file_name != loaded_file or dataset_mtime(file_name) != loaded_mtime:
+            print_debug(f'Loading {file_name} in this process.')
+            set_dataset(file_name)
+
+# The dataset is loaded on first use, see `ensure_dataset`
+data = None
+loaded_file = None
+loaded_mtime = None
+data_filtered = None
+dataset_lock = threading.Lock()
+
+metadata = load_metadata(default_file)
+minTimestamp = metadata['min_timestamp']
+maxTimestamp = metadata['max_timestamp']
 
 relayoutData = {}
 map_center = {}
 
 # map color modes
 color_modes = ['country', 'sub_event_type', 'event_date', 'fatalities']
-choropleth_color_modes = data['event_type'].unique().tolist()
+choropleth_color_modes = metadata['event_types']
 
-sub_event_type_color_map = {set: px.colors.qualitative.Prism[i % len(px.colors.qualitative.Prism)] for i, set in enumerate(sorted(data['sub_event_type'].unique()))}
-event_type_color_map = {et: px.colors.qualitative.Prism[i % len(px.colors.qualitative.Prism)] for i, et in enumerate(sorted(data['event_type'].unique()))}
+sub_event_type_color_map = metadata['sub_event_type_color_map']
+event_type_color_map = metadata['event_type_color_map']
+countries = metadata['countries']
+country_color_map = metadata['country_color_map']
 
-# country color map
-country_palette = px.colors.qualitative.Alphabet
-countries = sorted(data['country'].unique())
-country_color_map = {}
+# filters `data_filtered` was computed with, see `count_events_by_source`
+source_filter = None
+# filter state `data_filtered` was last computed for in this process, see `apply_filter_state`
+current_filter_state = None
 
-for i, country in enumerate(countries):
-    if country.lower() == 'ukraine':
-        country_color_map[country] = 'blue'
-    elif country.lower() == 'russia':
-        country_color_map[country] = 'red'
-    else:
-        country_color_map[country] = country_palette[i % len(country_palette)]
+# Number of ranked search results listed below the search box
+SEARCH_RESULTS_SHOWN = 10
 
-data_filtered = data[(data['event_date'].apply(lambda x: int(pd.Timestamp(x).timestamp())) >= minTimestamp) &
-                 (data['event_date'].apply(lambda x: int(pd.Timestamp(x).timestamp())) <= maxTimestamp)]
+# Default number of sources shown in the events by source widget
+TOP_SOURCES_SHOWN = 5
 
-first_of_years = data.groupby([data['event_date'].dt.year])['event_date'].min().sort_values()
+# Datasets up to this size can be filtered in the browser, see `build_clientside_data`
+CLIENTSIDE_MAX_ROWS = 300_000
 
 # Configurable number of rows and columns for widgets
 WIDGET_ROWS = 10
@@ -121,8 +309,17 @@ app.layout = html.Div(
         'margin': '0',
     },
     children=[
-        html.Div(id='update-metaelement', style={'display': 'none'}),
+        dcc.Store(id='update-metaelement'),
         html.Div(id='meta-update-dataset', style={'display': 'none'}),
+        dcc.Store(id='clientside-data'),
+        # filled by `assets/lazy_widgets.js`, see `update_lazy_widgets`
+        dcc.Store(id='visible-widgets'),
+        dcc.Store(id='rendered-widgets'),
+        # controls forwarded to the server callbacks unless clientside filtering handles them, see `forward_to_server`
+        dcc.Store(id='server-filters'),
+        dcc.Store(id='server-map-options'),
+        dcc.Store(id='server-top-sources'),
+        dcc.Store(id='server-visible-widgets'),
         # Header row with title and date slider
         html.Header(
             style={
@@ -159,7 +356,7 @@ app.layout = html.Div(
                             minTimestamp, maxTimestamp, 86400,
                             value=[minTimestamp, maxTimestamp],
                             id='date-slider',
-                            marks={int(pd.Timestamp(date).timestamp()): date.strftime('%Y-%m-%d') for date in first_of_years},
+                            marks=metadata['slider_marks'],
                             tooltip={'placement': 'bottom', 'always_visible': True, 'transform': 'formatTimestamp'},
                             allowCross=False
                         ),
@@ -202,6 +399,16 @@ app.layout = html.Div(
                         ),
                         html.Button('Reload Dataset', id='reload-dataset-button', n_clicks=0, style={'width': '100%'}),
                         html.H3('Data Preprocessing', style={'fontWeight': 'bold'}),
+                        html.Div([
+                            html.Label('Countries'),
+                            dcc.Dropdown(
+                                options=countries,
+                                id='country-selector',
+                                multi=True,
+                                placeholder='All countries',
+                                style={'marginTop': '0.5rem', 'marginBottom': '0.5rem'}
+                            ),
+                        ]),
                         html.Div([
                             html.Label('Actor Filter'),
                             dcc.Input(
@@ -214,12 +421,30 @@ app.layout = html.Div(
                             ),
                             html.Button('Filter', id='preprocessing-actor-filter-reload-button', n_clicks=0, style={'width': '100%'})
                         ]),
+                        html.Div([
+                            html.Label('Search'),
+                            dcc.Input(
+                                id='search-input',
+                                type='search',
+                                value='',
+                                placeholder='Search notes, actors, locations, sources',
+                                style={'width': '100%', 'marginTop': '0.5rem', 'marginBottom': '0.5rem'},
+                                debounce=True
+                            ),
+                            html.Div(id='search-results', style={'fontSize': '0.9rem'})
+                        ], style={'marginTop': '0.5rem'}),
                         html.Div([
                             dcc.Checklist(
                                 ['Include Non-Fatal Events'],
                                 ['Include Non-Fatal Events'],
                                 id='bool_options',
                                 style={'marginTop': '0.5rem'}
+                            ),
+                            dcc.Checklist(
+                                ['Clientside Filtering'],
+                                [],
+                                id='clientside-mode',
+                                style={'marginTop': '0.5rem'}
                             )
                         ]),
                         html.Hr(style={'margin': '1rem 0'}),
@@ -232,6 +457,20 @@ app.layout = html.Div(
                             ),
                         ]),
                         html.Hr(style={'margin': '1rem 0'}),
+                        html.H3('Widget Options', style={'fontWeight': 'bold'}),
+                        html.Div([
+                            html.Label('Top Reporting Sources'),
+                            dcc.Input(
+                                id='top-sources-selector',
+                                type='number',
+                                min=1,
+                                step=1,
+                                value=TOP_SOURCES_SHOWN,
+                                style={'width': '100%', 'marginTop': '0.5rem'},
+                                debounce=True
+                            ),
+                        ]),
+                        html.Hr(style={'margin': '1rem 0'}),
                         html.Div(
                             id='notes',
                             style={
@@ -288,7 +527,8 @@ app.layout = html.Div(
                         *[
                             html.Div(
                                 dcc.Graph(id=widget_id),
-                                className='widget',
+                                className='widget lazy-widget',
+                                **{'data-widget': widget_id},
                                 style={
                                     'backgroundColor': 'white',
                                     'borderRadius': '12px',
@@ -314,18 +554,22 @@ app.layout = html.Div(
 
 @callback([
     Output('meta-update-dataset', 'children'),
+    Output('country-selector', 'options'),
+    Output('country-selector', 'value'),
 ], [
     Input('dataset-selector', 'value'),
     Input('reload-dataset-button', 'n_clicks'),
+], [
+    State('country-selector', 'value'),
 ], running=[
     (Output('loading-indicator', 'className'), 'loader on', 'loader')
 ])
-def reload_dataset(selected_file: str, n_clicks: int):
+def reload_dataset(selected_file: str, n_clicks: int, selected_countries: list[str]):
     """
-    This function is called by the dataset selector or the reload button.
-    It reloads the data from the selected file and updates the notes.
+    This function is called by the dataset selector or the reload button, and on every page load.
+    It loads the selected file if this process does not hold it yet, the reload button always reads it again.
+    The country selection is kept for countries which are also present in the new dataset.
     """
-    global data
     global available_files
 
     print_debug(f'Reloading dataset. Triggered by {ctx.triggered_id}.')
@@ -335,39 +579,98 @@ def reload_dataset(selected_file: str, n_clicks: int):
         print_debug('No file selected, using default file.')
         selected_file = default_file
 
-    data = load_data(selected_file)
+    if ctx.triggered_id == 'reload-dataset-button':
+        with dataset_lock:
+            set_dataset(selected_file)
+    else:
+        # keeps the dataset loaded before the workers were started, see `gunicorn.conf.py`
+        ensure_dataset(selected_file)
     update_available_files()
 
-    return [None]
+    dataset_countries = sorted(country_partitions)
+    selected_countries = [country for country in selected_countries or [] if country in country_partitions]
+    return [selected_file, dataset_countries, selected_countries]
 
 @callback([
-    Output('update-metaelement', 'children'),
+    Output('update-metaelement', 'data'),
+    Output('search-results', 'children'),
 ], [
     Input('meta-update-dataset', 'children'),
-    Input('date-slider', 'value'),
-    Input('bool_options', 'value'),
-    Input('preprocessing-actor-filter', 'value'),
-    Input('preprocessing-actor-filter-reload-button', 'n_clicks')
+    Input('server-filters', 'data'),
+    Input('search-input', 'value'),
+], [
+    State('clientside-mode', 'value'),
 ], running=[
     (Output('loading-indicator', 'className'), 'loader on', 'loader')
 ])
-def update_df(_, interval, bool_options: list[str], preprocessing_actor_filter: str, n_clicks: int):
+def update_df(selected_file: str, server_filters: list, search_query: str, clientside_mode: list[str]):
     """
     This function is called by widgets which update the data selection.
     It filters the global `data` DataFrame into `data_filtered`.
-    Then it returns a dummy output, which is used to trigger `update_widgets`.
+    Then it returns the filter state, which is used to trigger `update_widgets`,
+    and the ranked list of search results.
+    In clientside filtering mode, the filters are applied by `assets/clientside.js` instead,
+    and the filter state is only updated once the mode is turned off or a search query is entered.
+    """
+    print_debug(f'Updating data. Triggered by {ctx.triggered_id}.')
+    print_debug(f'Arguments: {selected_file=}, {server_filters=}, {search_query=}, {clientside_mode=}')
+
+    if server_filters is None:
+        raise PreventUpdate
+    interval, bool_options, preprocessing_actor_filter, n_clicks, selected_countries = server_filters
+
+    ensure_dataset(selected_file)
+    # the clientside data may not have arrived yet when the mode is turned on, see `forward_to_server`
+    if clientside_filtering_active(clientside_mode, search_query):
+        print_debug('Clientside filtering active, skipping filtering on the server')
+        return [no_update, None]
+
+    filter_state = {
+        'dataset': selected_file,
+        # changes when the file is reloaded, so widgets rendered from the old data are not reused
+        'version': loaded_mtime,
+        'interval': interval,
+        'bool_options': bool_options,
+        'actor_filter': preprocessing_actor_filter,
+        'search': search_query,
+        'countries': selected_countries,
+    }
+    search_scores = apply_filter_state(filter_state)
+    return [filter_state, render_search_results(search_scores)]
+
+def apply_filter_state(filter_state: dict) -> pd.Series | None:
+    """
+    Loads the dataset and filters `data_filtered` as described by `filter_state`, see `update_df`.
+    """
+    global current_filter_state
+
+    ensure_dataset(filter_state['dataset'])
+    search_scores = filter_data(filter_state['interval'], filter_state['bool_options'], filter_state['actor_filter'],
+                                filter_state['search'], filter_state['countries'])
+    current_filter_state = filter_state
+    return search_scores
+
+def filter_data(interval, bool_options: list[str], preprocessing_actor_filter: str, search_query: str,
+                selected_countries: list[str]) -> pd.Series | None:
+    """
+    Filters the global `data` DataFrame into `data_filtered`, see `update_df`.
+    Returns the search scores of all rows in `data`, or None if there is no search query.
     """
     global data
     global data_filtered
+    global source_filter
 
-    print_debug(f'Updating data. Triggered by {ctx.triggered_id}.')
-    print_debug(f'Arguments: {interval=}, {bool_options=}, {preprocessing_actor_filter=}, {n_clicks=}')
+    partition = select_country_partition(selected_countries)
 
     minTimestamp, maxTimestamp = interval
-    data_filtered = data[
-        (data['event_date'].apply(lambda x: int(pd.Timestamp(x).timestamp())) >= minTimestamp) &
-        (data['event_date'].apply(lambda x: int(pd.Timestamp(x).timestamp())) <= maxTimestamp)
-    ]
+    mask = (partition['event_date_i'] >= minTimestamp) & (partition['event_date_i'] <= maxTimestamp)
+
+    search_scores = None
+    if search_query:
+        search_scores = pd.Series(search(search_index, search_query), index=data.index)
+        mask &= search_scores.loc[partition.index] > 0
+
+    data_filtered = partition[mask]
 
     if 'Include Non-Fatal Events' not in bool_options:
         data_filtered = data_filtered[data_filtered['fatalities'] > 0]
@@ -377,52 +680,308 @@ def update_df(_, interval, bool_options: list[str], preprocessing_actor_filter:
         data_filtered = data_filtered[data_filtered['actor1'].str.contains(preprocessing_actor_filter, case=False, na=False) |
                                       data_filtered['actor2'].str.contains(preprocessing_actor_filter, case=False, na=False)]
 
+    # unless the search or the actor filter select individual rows, widgets can answer from per-day aggregates
+    source_filter = {
+        'interval': (minTimestamp, maxTimestamp),
+        'countries': selected_countries,
+        'include_non_fatal': 'Include Non-Fatal Events' in bool_options,
+        'aggregated': not search_query and not preprocessing_actor_filter,
+    }
+
     print_debug(f'Filtered data contains {len(data_filtered)} rows.')
 
-    return [None]
+    return search_scores
+
+def select_country_partition(selected_countries) -> pd.DataFrame:
+    """
+    Returns the rows of `data` belonging to the selected countries, or all of `data` if none are selected.
+    """
+    if not selected_countries:
+        return data
+    rows = [country_partitions[country] for country in selected_countries if country in country_partitions]
+    if not rows:
+        return data.iloc[:0]
+    return data.take(np.sort(np.concatenate(rows)))
+
+def render_search_results(search_scores):
+    global data_filtered
+
+    if search_scores is None:
+        return None
+    if len(data_filtered) == 0:
+        return 'No matching events.'
+
+    top_events = data_filtered.loc[search_scores.loc[data_filtered.index].nlargest(SEARCH_RESULTS_SHOWN).index]
+    return html.Div(children=[
+        html.P(f'{len(data_filtered)} matching events, best matches:'),
+        html.Ol(children=[
+            html.Li(f'{event['event_date'].strftime('%Y-%m-%d')}, {event['location']}: {event['sub_event_type']}')
+            for _, event in top_events.iterrows()
+        ])
+    ])
     
 @callback([
     Output('map', 'figure'),
     Output('date-slider-output', 'children'),
-    Output('event-type-pie', 'figure'),
     Output('choropleth-map', 'figure'),
-    Output('events-over-time', 'figure'),
-    Output('events-over-time-3d', 'figure'),
-    Output('events-by-source', 'figure'),
-    Output('event-type-bar', 'figure'),
-    Output('fatalities-line', 'figure'),
-    Output('fatalities-line-non-cumulative', 'figure'),
-    Output('fatalities-pie', 'figure'),
-    Output('subeventtype-line', 'figure'),
 ], [
-    Input('update-metaelement', 'children'),
-    Input('map-color-selector', 'value'),
-    Input('choropleth-map-color-selector', 'value'),
+    Input('update-metaelement', 'data'),
+    Input('server-map-options', 'data'),
 ], [
-    State('map', 'relayoutData')
+    State('map', 'relayoutData'),
+    State('clientside-mode', 'value'),
+    State('search-input', 'value'),
 ], running=[
     (Output('loading-indicator', 'className'), 'loader on', 'loader')
 ])
-def update_widgets(arg, map_color_mode: str, choropleth_options: str, relayoutData):
+def update_widgets(filter_state: dict, map_options: list[str], relayoutData, clientside_mode: list[str], search_query: str):
     """
     This function is called by the `update_df` callback, or by a widget which changes display options.
-    It updates all widgets in the app.
+    It updates the maps and the date slider text, the widgets below are rendered by `update_lazy_widgets`.
+    If this request is served by another worker than `update_df`, the filters are applied again first.
+    In clientside filtering mode, all widgets are rendered by the clientside callbacks instead.
     """
     print_debug(f'Updating widgets. Triggered by {ctx.triggered_id}.')
-    print_debug(f'Arguments: {arg=}, {map_color_mode=}, {choropleth_options=}')
+    print_debug(f'Arguments: {filter_state=}, {map_options=}, {clientside_mode=}')
+
+    if filter_state is None or map_options is None:
+        raise PreventUpdate
+    map_color_mode, choropleth_options = map_options
+    ensure_dataset(filter_state['dataset'])
+    if clientside_filtering_active(clientside_mode, search_query):
+        print_debug('Clientside filtering active, skipping widgets')
+        raise PreventUpdate
+    if filter_state != current_filter_state:
+        apply_filter_state(filter_state)
 
     return render_map(map_color_mode, relayoutData), \
         update_date_slider_text(minTimestamp, maxTimestamp), \
-        update_event_type_pie(), \
-        update_choropleth(choropleth_options), \
-        update_events_over_time(), \
-        update_events_over_time_3d(), \
-        update_events_by_source(), \
-        update_event_type_bar(), \
-        update_fatalities_line(), \
-        update_fatalities_line_non_cumulative(), \
-        update_fatalities_pie(), \
-        update_subeventtype_line()
+        update_choropleth(choropleth_options)
+
+lazy_widget_ids = [widget_id for widget_id, _ in widget_graphs[:WIDGET_ROWS * WIDGET_COLS]]
+
+@callback([
+    *[Output(widget_id, 'figure') for widget_id in lazy_widget_ids],
+    Output('rendered-widgets', 'data'),
+], [
+    Input('update-metaelement', 'data'),
+    Input('server-visible-widgets', 'data'),
+], [
+    State('rendered-widgets', 'data'),
+    State('clientside-mode', 'value'),
+    State('search-input', 'value'),
+    State('top-sources-selector', 'value'),
+], running=[
+    (Output('loading-indicator', 'className'), 'loader on', 'loader')
+])
+def update_lazy_widgets(filter_state: dict, server_visible_widgets: list, rendered_widgets: dict, clientside_mode: list[str],
+                        search_query: str, top_sources: int):
+    """
+    This function is called by the `update_df` callback, or when widgets are scrolled into view.
+    It only renders the widgets which are visible and have not been rendered for the current filter state yet,
+    the others keep their figure until they are scrolled into view.
+    """
+    print_debug(f'Updating lazy widgets. Triggered by {ctx.triggered_id}.')
+    print_debug(f'Arguments: {server_visible_widgets=}, {rendered_widgets=}')
+
+    if filter_state is None:
+        raise PreventUpdate
+    visible_widgets = server_visible_widgets[0] if server_visible_widgets else None
+    ensure_dataset(filter_state['dataset'])
+    if clientside_filtering_active(clientside_mode, search_query):
+        print_debug('Clientside filtering active, skipping widgets')
+        raise PreventUpdate
+
+    rendered = []
+    if rendered_widgets and rendered_widgets['filter_state'] == filter_state:
+        rendered = rendered_widgets['widgets']
+
+    to_render = [
+        widget_id for widget_id in visible_widgets or []
+        if widget_id in lazy_widget_ids and widget_id not in rendered
+    ]
+    print_debug(f'Rendering {to_render}')
+
+    if to_render and filter_state != current_filter_state:
+        apply_filter_state(filter_state)
+
+    figures = [render_widget(widget_id, top_sources) if widget_id in to_render else no_update for widget_id in lazy_widget_ids]
+    return [*figures, {'filter_state': filter_state, 'widgets': rendered + to_render}]
+
+@callback(
+    Output('events-by-source', 'figure', allow_duplicate=True),
+    Input('server-top-sources', 'data'),
+    State('update-metaelement', 'data'),
+    State('clientside-mode', 'value'),
+    State('search-input', 'value'),
+    prevent_initial_call=True
+)
+def update_top_sources(server_top_sources: list, filter_state: dict, clientside_mode: list[str], search_query: str):
+    """
+    This function is called when the number of top reporting sources is changed.
+    """
+    if filter_state is None or server_top_sources is None:
+        raise PreventUpdate
+    top_sources, = server_top_sources
+    ensure_dataset(filter_state['dataset'])
+    if clientside_filtering_active(clientside_mode, search_query):
+        raise PreventUpdate
+    if filter_state != current_filter_state:
+        apply_filter_state(filter_state)
+    return render_widget('events-by-source', top_sources)
+
+def render_widget(widget_id: str, top_sources: int | None = None):
+    if widget_id == 'events-by-source':
+        # the number input can be cleared or set to fractions and values below its minimum
+        top_sources = TOP_SOURCES_SHOWN if top_sources is None else max(1, int(top_sources))
+        return update_events_by_source(top_sources)
+    return widget_builders[widget_id]()
+
+def clientside_filtering_active(clientside_mode, search_query) -> bool:
+    # searching is only implemented on the server, see `search.py`
+    return bool(clientside_mode) and len(data) <= CLIENTSIDE_MAX_ROWS and not search_query
+
+@callback(
+    Output('clientside-data', 'data'),
+    Input('meta-update-dataset', 'children'),
+    Input('clientside-mode', 'value'),
+)
+def update_clientside_data(selected_file: str, clientside_mode: list[str]):
+    """
+    This function is called when the dataset is reloaded or the clientside filtering mode is toggled.
+    It ships the columnar copy of `data` to the browser, or clears it if the mode is off or the dataset is too large.
+    """
+    ensure_dataset(selected_file)
+    if not clientside_mode or len(data) > CLIENTSIDE_MAX_ROWS:
+        return None
+    print_debug(f'Sending {len(data)} rows to the client for clientside filtering.')
+    return build_clientside_data(data)
+
+def build_clientside_data(data: pd.DataFrame) -> dict:
+    """
+    Builds a compact, column oriented copy of the fields needed by `assets/clientside.js`.
+    Text columns are dictionary encoded, so each row only carries integer codes.
+    """
+    actor_codes, actors = pd.factorize(pd.concat([data['actor1'], data['actor2']], ignore_index=True))
+    event_type_codes, event_types = pd.factorize(data['event_type'])
+    sub_event_type_codes, sub_event_types = pd.factorize(data['sub_event_type'])
+    country_codes, country_names = pd.factorize(data['country'])
+    admin1_codes, admin1_names = pd.factorize(data['admin1'])
+    return {
+        'id': data['event_id_cnty'].tolist(),
+        't': data['event_date_i'].tolist(),
+        'f': data['fatalities'].tolist(),
+        'lat': data['latitude'].round(5).tolist(),
+        'lon': data['longitude'].round(5).tolist(),
+        'a1': actor_codes[:len(data)].tolist(),
+        'a2': actor_codes[len(data):].tolist(),
+        'actors': actors.tolist(),
+        'et': event_type_codes.tolist(),
+        'event_types': event_types.tolist(),
+        'set': sub_event_type_codes.tolist(),
+        'sub_event_types': sub_event_types.tolist(),
+        'c': country_codes.tolist(),
+        'countries': country_names.tolist(),
+        'ad': admin1_codes.tolist(),
+        'admin1s': admin1_names.tolist(),
+        # the exploded source index, row positions and source codes
+        'sr': source_index['row'].tolist(),
+        'sc': (source_index['key'] // len(source_index['sub_event_types'])).tolist(),
+        'sources': source_index['sources'].tolist(),
+        'top_sources': TOP_SOURCES_SHOWN,
+        'event_type_colors': event_type_color_map,
+        'sub_event_type_colors': sub_event_type_color_map,
+        'country_colors': country_color_map,
+        # the same color scales as `render_map` and `update_choropleth`
+        'colorscales': {
+            'event_date': make_colorscale(px.colors.sequential.Plasma),
+            'fatalities': make_colorscale(px.colors.sequential.Bluered),
+            'choropleth': make_colorscale(px.colors.sequential.matter),
+        },
+        'geojson_url': ukraine_geojson_url(),
+        # use the same template as the figures created by plotly express
+        'template': px.line().layout.template.to_plotly_json(),
+    }
+
+def forward_to_server(store_id: str, inputs: list[Input]):
+    """
+    Copies the values of `inputs` into the store `store_id`, which the server callbacks listen to instead.
+    While clientside filtering is active the store is left unchanged, so these controls cause no requests at all.
+    Toggling the mode, the arrival of the clientside data and the search input are inputs too,
+    so values changed in the meantime are forwarded once the server has to take over.
+    """
+    clientside_callback(
+        ClientsideFunction(namespace='clientside', function_name='forward_to_server'),
+        Output(store_id, 'data'),
+        [
+            Input('clientside-mode', 'value'),
+            Input('clientside-data', 'data'),
+            Input('search-input', 'value'),
+            *inputs,
+        ],
+        State(store_id, 'data'),
+    )
+
+forward_to_server('server-filters', [
+    Input('date-slider', 'value'),
+    Input('bool_options', 'value'),
+    Input('preprocessing-actor-filter', 'value'),
+    Input('preprocessing-actor-filter-reload-button', 'n_clicks'),
+    Input('country-selector', 'value'),
+])
+forward_to_server('server-map-options', [
+    Input('map-color-selector', 'value'),
+    Input('choropleth-map-color-selector', 'value'),
+])
+forward_to_server('server-top-sources', [Input('top-sources-selector', 'value')])
+forward_to_server('server-visible-widgets', [Input('visible-widgets', 'data')])
+
+# In clientside filtering mode, all widgets are rendered by these clientside callbacks, see `assets/clientside.js`
+clientside_callback(
+    ClientsideFunction(namespace='clientside', function_name='filter_widgets'),
+    [
+        Output('date-slider-output', 'children', allow_duplicate=True),
+        Output('event-type-pie', 'figure', allow_duplicate=True),
+        Output('event-type-bar', 'figure', allow_duplicate=True),
+        Output('fatalities-line', 'figure', allow_duplicate=True),
+        Output('fatalities-line-non-cumulative', 'figure', allow_duplicate=True),
+        Output('fatalities-pie', 'figure', allow_duplicate=True),
+    ],
+    [
+        Input('date-slider', 'drag_value'),
+        Input('date-slider', 'value'),
+        Input('bool_options', 'value'),
+        Input('preprocessing-actor-filter', 'value'),
+        Input('country-selector', 'value'),
+        Input('clientside-data', 'data'),
+        Input('search-input', 'value'),
+    ],
+    prevent_initial_call=True
+)
+
+clientside_callback(
+    ClientsideFunction(namespace='clientside', function_name='filter_map_widgets'),
+    [
+        Output('map', 'figure', allow_duplicate=True),
+        Output('choropleth-map', 'figure', allow_duplicate=True),
+        Output('subeventtype-line', 'figure', allow_duplicate=True),
+        Output('events-by-source', 'figure', allow_duplicate=True),
+        Output('events-over-time', 'figure', allow_duplicate=True),
+        Output('events-over-time-3d', 'figure', allow_duplicate=True),
+    ],
+    [
+        Input('date-slider', 'value'),
+        Input('bool_options', 'value'),
+        Input('preprocessing-actor-filter', 'value'),
+        Input('country-selector', 'value'),
+        Input('clientside-data', 'data'),
+        Input('search-input', 'value'),
+        Input('map-color-selector', 'value'),
+        Input('choropleth-map-color-selector', 'value'),
+        Input('top-sources-selector', 'value'),
+    ],
+    prevent_initial_call=True
+)
 
 
 def render_map(color_mode, relayout_data=None):
@@ -550,7 +1109,7 @@ def update_event_type_pie():
     )
     return fig
 
-def update_choropleth(event_type_selector):
+def update_choropleth(event_type_selector, embed_geojson=False):
     global data_filtered
 
     filtered = data_filtered[data_filtered['country'].isin(['Ukraine'])]
@@ -577,16 +1136,12 @@ def update_choropleth(event_type_selector):
     # max event count for color range
     max_event_count = admin1_event_counts.get(event_type_selector, pd.Series([0])).max()
 
-    # GeoJSON-Dateien laden
-
-    ukraine_geojson_directory = 'geodata/ukraine_geojson/'
-    geojson_files = load_geojson_files_with_featureid(ukraine_geojson_directory)
-    merged_geojson = merge_geojsons(geojson_files)
-
+    # The browser loads the GeoJSON once from its URL, instead of receiving it with every figure
+    geojson = load_ukraine_geojson() if embed_geojson else ukraine_geojson_url()
 
     fig = px.choropleth_map(
         admin1_event_counts,
-        geojson=merged_geojson,
+        geojson=geojson,
         color=event_type_selector,
         locations="admin1",
         featureidkey="id",
@@ -601,6 +1156,36 @@ def update_choropleth(event_type_selector):
     fig.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
     return fig
 
+@functools.cache
+def load_ukraine_geojson():
+    ukraine_geojson_directory = 'geodata/ukraine_geojson/'
+    geojson_files = load_geojson_files_with_featureid(ukraine_geojson_directory)
+    return merge_geojsons(geojson_files)
+
+@functools.cache
+def ukraine_geojson_version() -> str:
+    return hashlib.sha256(json.dumps(load_ukraine_geojson(), sort_keys=True).encode()).hexdigest()[:16]
+
+def ukraine_geojson_url() -> str:
+    # the URL changes with the content, so browsers never keep outdated shapes, see `add_cache_headers`
+    return f'{UKRAINE_GEOJSON_URL}?v={ukraine_geojson_version()}'
+
+@app.server.route(UKRAINE_GEOJSON_URL)
+def serve_ukraine_geojson():
+    return Response(json.dumps(load_ukraine_geojson()), mimetype='application/json')
+
+@app.server.after_request
+def add_cache_headers(response):
+    # Versioned URLs change whenever their content changes, so browsers can keep them until then.
+    # Dash adds the modification time of assets as `m`, the GeoJSON URL contains a hash of its content as `v`.
+    versioned_asset = request.path.startswith(app.get_asset_url('')) and 'm' in request.args
+    versioned_geojson = request.path == UKRAINE_GEOJSON_URL and request.args.get('v') == ukraine_geojson_version()
+    if versioned_asset or versioned_geojson:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+    return response
+
 def load_geojson_files_with_featureid(dir):
     geojson_data = {}
     #print_debug("Loading GeoJSON files from directory:", dir)
@@ -677,10 +1262,11 @@ def update_events_over_time_3d():
     )
     return fig
 
-@callback(Output('notes', 'children'), Input('map', 'clickData'))
-def update_notes(clickData):
+@callback(Output('notes', 'children'), Input('map', 'clickData'), State('meta-update-dataset', 'children'))
+def update_notes(clickData, selected_file):
     if clickData is None:
         return 'Click on a point on the map for details...'
+    ensure_dataset(selected_file)
     id = clickData['points'][0]['customdata'][0]
     point_data = data[data['event_id_cnty'] == id].iloc[0]
     return html.P(children=[
@@ -690,11 +1276,12 @@ def update_notes(clickData):
         html.B(children=['Notes: ']), f'{point_data['notes']}', html.Br(),
     ])
 
-@callback(Output('date-slider', 'marks'), Input('map', 'clickData'))
-def update_date_slider(clickData):
-    markers = {int(pd.Timestamp(date).timestamp()): date.strftime('%Y-%m-%d') for date in first_of_years}
+@callback(Output('date-slider', 'marks'), Input('map', 'clickData'), State('meta-update-dataset', 'children'))
+def update_date_slider(clickData, selected_file):
+    markers = dict(metadata['slider_marks'])
     if clickData is None:
         return markers
+    ensure_dataset(selected_file)
     id = clickData['points'][0]['customdata'][0]
     point_data = data[data['event_id_cnty'] == id].iloc[0]
     date = point_data['event_date']
@@ -708,35 +1295,66 @@ def update_date_slider(clickData):
     }
     return markers 
 
-def update_events_by_source():
+def count_events_by_source() -> np.ndarray:
+    """
+    Returns the number of events of `data_filtered` per individual source (rows) and sub event type (columns).
+    """
     global data_filtered
-    # Count events per source
-    top_sources = (
-        data_filtered.groupby(['source']).size()
-        .nlargest(5)
-        .index.tolist()
-    )
-    filtered_top = data_filtered[data_filtered['source'].isin(top_sources)]
-    source_event_counts = (
-        filtered_top.groupby(['source', 'sub_event_type'])
-        .size()
-        .reset_index(name='count')
-    )
+    global source_filter
+
+    minTimestamp, maxTimestamp = source_filter['interval']
+    if source_filter['aggregated']:
+        # sum up the per-day counts within the date range, restricted to the selected countries and fatal events
+        start = np.searchsorted(source_counts['event_date_i'], minTimestamp, side='left')
+        end = np.searchsorted(source_counts['event_date_i'], maxTimestamp, side='right')
+        keys = source_counts['key'][start:end]
+        weights = source_counts['count'][start:end]
+        mask = np.ones(end - start, dtype=bool)
+        if source_filter['countries']:
+            country_codes = np.flatnonzero(np.isin(source_counts['countries'], source_filter['countries']))
+            mask &= np.isin(source_counts['country'][start:end], country_codes)
+        if not source_filter['include_non_fatal']:
+            mask &= source_counts['fatal'][start:end]
+        keys, weights = keys[mask], weights[mask]
+    else:
+        # the filtered events lie within the date range, only check the sources of that slice
+        start = np.searchsorted(source_index['event_date_i'], minTimestamp, side='left')
+        end = np.searchsorted(source_index['event_date_i'], maxTimestamp, side='right')
+        selected = np.zeros(len(data), dtype=bool)
+        selected[data.index.get_indexer(data_filtered.index)] = True
+        keys = source_index['key'][start:end][selected[source_index['row'][start:end]]]
+        weights = None
+
+    shape = (len(source_index['sources']), len(source_index['sub_event_types']))
+    return np.bincount(keys, weights=weights, minlength=shape[0] * shape[1]).astype(np.int64).reshape(shape)
+
+def events_by_source_table(counts: np.ndarray, sources: np.ndarray) -> pd.DataFrame:
+    """
+    Lists the nonzero `counts` (see `count_events_by_source`) of the given source codes, in that order.
+    """
+    source_positions, sub_event_type_codes = np.nonzero(counts[sources])
+    return pd.DataFrame({
+        'source': source_index['sources'][sources[source_positions]],
+        'sub_event_type': source_index['sub_event_types'][sub_event_type_codes],
+        'count': counts[sources[source_positions], sub_event_type_codes],
+    })
+
+def update_events_by_source(top_n: int = TOP_SOURCES_SHOWN):
+    counts = count_events_by_source()
+
     # Sort by total number of reports per source (descending)
-    source_totals = source_event_counts.groupby('source')['count'].sum().sort_values(ascending=False)
-    source_event_counts['source'] = pd.Categorical(
-        source_event_counts['source'],
-        categories=source_totals.index,
-        ordered=True
-    )
-    source_event_counts = source_event_counts.sort_values(['source', 'sub_event_type'])
+    totals = counts.sum(axis=1)
+    top = np.argsort(-totals, kind='stable')[:top_n]
+    top = top[totals[top] > 0]
+    top_sources = source_index['sources'][top].tolist()
     fig = px.bar(
-        source_event_counts,
+        events_by_source_table(counts, top),
         x='source',
         y='count',
         color='sub_event_type',
         color_discrete_map=sub_event_type_color_map,
-        title='Top 5 Reporting Sources and Sub Event Types',
+        category_orders={'source': top_sources},
+        title=f'Top {top_n} Reporting Sources and Sub Event Types',
         labels={'count': 'Number of Events', 'source': 'Source', 'sub_event_type': 'Sub Event Type'},
         barmode='stack'
     )
@@ -836,6 +1454,19 @@ def update_subeventtype_line():
     fig.update_layout(legend_title_text='Sub Event Type')
     return fig
 
+# Functions rendering the widgets of `widget_graphs`
+widget_builders = {
+    'fatalities-line-non-cumulative': update_fatalities_line_non_cumulative,
+    'fatalities-line': update_fatalities_line,
+    'subeventtype-line': update_subeventtype_line,
+    'fatalities-pie': update_fatalities_pie,
+    'event-type-pie': update_event_type_pie,
+    'event-type-bar': update_event_type_bar,
+    'events-by-source': update_events_by_source,
+    'events-over-time': update_events_over_time,
+    'events-over-time-3d': update_events_over_time_3d,
+}
+
 if __name__ == '__main__':
     app.run(host="0.0.0.0", port=8050, debug=debug, dev_tools_hot_reload=debug, dev_tools_ui=debug)
 server = app.server
\ No newline at end of file
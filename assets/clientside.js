@@ -0,0 +1,416 @@
+window.dash_clientside = window.dash_clientside || {};
+
+// Clientside filtering mode, mirrors the filtering in `filter_data` and the widgets rendered by the server
+// on the columnar copy of the dataset stored in `clientside-data`, see `build_clientside_data`.
+window.dash_clientside.clientside = {
+    // forwards the values of controls to a store read by the server, unless the browser handles them, see `forward_to_server`
+    forward_to_server: function(clientsideMode, columns, searchQuery, ...values) {
+        // the last argument is the current content of the store
+        const forwarded = values.pop();
+        const clientsideActive = clientsideMode && clientsideMode.length && columns && !searchQuery;
+        if (clientsideActive || JSON.stringify(values) === JSON.stringify(forwarded)) {
+            return window.dash_clientside.no_update;
+        }
+        return values;
+    },
+
+    // follows the slider while it is dragged, so only renders the cheap widgets
+    filter_widgets: function(interval, sliderValue, boolOptions, actorFilter, selectedCountries, columns, searchQuery) {
+        const noUpdate = window.dash_clientside.no_update;
+        const [minTimestamp, maxTimestamp] = interval || sliderValue || [];
+        // searching is done by the server, which renders all widgets in that case
+        const rows = searchQuery ? null : filterRows(columns, [minTimestamp, maxTimestamp], boolOptions, actorFilter, selectedCountries);
+        if (!rows) {
+            return Array(6).fill(noUpdate);
+        }
+
+        return [
+            dateSliderText(minTimestamp, maxTimestamp, rows.length),
+            eventTypePie(columns, rows),
+            eventTypeBar(columns, rows),
+            fatalitiesLine(columns, rows, true),
+            fatalitiesLine(columns, rows, false),
+            fatalitiesPie(columns, rows),
+        ];
+    },
+
+    // renders the maps and the remaining widgets once the slider is released
+    filter_map_widgets: function(sliderValue, boolOptions, actorFilter, selectedCountries, columns, searchQuery,
+                                 mapColorMode, choroplethEventType, topSources) {
+        const noUpdate = window.dash_clientside.no_update;
+        const rows = searchQuery ? null : filterRows(columns, sliderValue, boolOptions, actorFilter, selectedCountries);
+        if (!rows) {
+            return Array(6).fill(noUpdate);
+        }
+
+        const counts = subEventTypeCounts(columns, rows);
+        return [
+            scatterMap(columns, rows, mapColorMode),
+            choroplethMap(columns, rows, choroplethEventType),
+            subEventTypeLine(columns, counts),
+            // same normalization of the number input as `render_widget`
+            eventsBySource(columns, rows, topSources == null ? columns.top_sources : Math.max(1, Math.trunc(topSources))),
+            eventsOverTime(columns, counts),
+            eventsOverTime3d(columns, counts),
+        ];
+    }
+};
+
+// Returns the positions of the rows matching the filters, or null if there is no data or the actor filter is invalid
+function filterRows(columns, interval, boolOptions, actorFilter, selectedCountries) {
+    if (!columns || !interval) {
+        return null;
+    }
+    const [minTimestamp, maxTimestamp] = interval;
+    const includeNonFatal = (boolOptions || []).includes('Include Non-Fatal Events');
+
+    let actorMatches = null;
+    if (actorFilter) {
+        let pattern;
+        try {
+            pattern = new RegExp(actorFilter, 'i');
+        } catch (e) {
+            return null;
+        }
+        actorMatches = columns.actors.map(actor => pattern.test(actor));
+    }
+
+    let countryMatches = null;
+    if (selectedCountries && selectedCountries.length) {
+        countryMatches = columns.countries.map(country => selectedCountries.includes(country));
+    }
+
+    const rows = [];
+    for (let i = 0; i < columns.t.length; i++) {
+        if (countryMatches && !countryMatches[columns.c[i]]) continue;
+        if (columns.t[i] < minTimestamp || columns.t[i] > maxTimestamp) continue;
+        if (!includeNonFatal && columns.f[i] <= 0) continue;
+        if (actorMatches && !(columns.a1[i] >= 0 && actorMatches[columns.a1[i]]) &&
+            !(columns.a2[i] >= 0 && actorMatches[columns.a2[i]])) continue;
+        rows.push(i);
+    }
+    return rows;
+}
+
+function formatDate(timestamp) {
+    return new Date(timestamp * 1000).toISOString().slice(0, 10);
+}
+
+function figure(columns, data, layout) {
+    return {data: data, layout: Object.assign({template: columns.template}, layout)};
+}
+
+function dateSliderText(minTimestamp, maxTimestamp, count) {
+    return `Showing data starting from ${formatDate(minTimestamp)} to ${formatDate(maxTimestamp)}. Currently showing ${count} events.`;
+}
+
+function eventTypePie(columns, rows) {
+    const counts = new Map();
+    for (const i of rows) {
+        const eventType = columns.event_types[columns.et[i]];
+        counts.set(eventType, (counts.get(eventType) || 0) + 1);
+    }
+    const names = [...counts.keys()];
+    return figure(columns, [{
+        type: 'pie',
+        labels: names,
+        values: names.map(name => counts.get(name)),
+        marker: {colors: names.map(name => columns.event_type_colors[name])},
+        hovertemplate: 'Event Type=%{label}<br>Number of Events=%{value}<extra></extra>',
+    }], {title: {text: 'Percentage of Total Events by Event Type'}, legend: {tracegroupgap: 0}});
+}
+
+function eventTypeBar(columns, rows) {
+    const counts = new Map();
+    for (const i of rows) {
+        const subEventType = columns.sub_event_types[columns.set[i]];
+        const eventType = columns.event_types[columns.et[i]];
+        if (!counts.has(subEventType)) counts.set(subEventType, new Map());
+        const byEventType = counts.get(subEventType);
+        byEventType.set(eventType, (byEventType.get(eventType) || 0) + 1);
+    }
+    const traces = [...counts.keys()].sort().map(subEventType => {
+        const byEventType = counts.get(subEventType);
+        return {
+            type: 'bar',
+            name: subEventType,
+            x: [...byEventType.keys()],
+            y: [...byEventType.values()],
+            marker: {color: columns.sub_event_type_colors[subEventType]},
+            hovertemplate: `Sub Event Type=${subEventType}<br>Event Type=%{x}<br>Number of Events=%{y}<extra></extra>`,
+        };
+    });
+    return figure(columns, traces, {
+        title: {text: 'Event Type Breakdown by Sub Event Type'},
+        barmode: 'stack',
+        legend: {title: {text: 'Sub Event Type'}},
+        xaxis: {title: {text: 'Event Type'}},
+        yaxis: {title: {text: 'Number of Events'}},
+    });
+}
+
+function fatalitiesLine(columns, rows, cumulative) {
+    const byDate = new Map();
+    for (const i of rows) {
+        byDate.set(columns.t[i], (byDate.get(columns.t[i]) || 0) + columns.f[i]);
+    }
+    const dates = [...byDate.keys()].sort((a, b) => a - b);
+    let total = 0;
+    const fatalities = dates.map(date => cumulative ? (total += byDate.get(date)) : byDate.get(date));
+    return figure(columns, [{
+        type: 'scatter',
+        mode: 'lines',
+        x: dates.map(formatDate),
+        y: fatalities,
+        hovertemplate: 'Date=%{x}<br>Number of Fatalities=%{y}<extra></extra>',
+    }], {
+        title: {text: cumulative ? 'Fatalities Over Time' : 'Fatalities Per Day'},
+        xaxis: {title: {text: 'Date'}},
+        yaxis: {title: {text: 'Number of Fatalities'}},
+    });
+}
+
+function fatalitiesPie(columns, rows) {
+    const sums = new Map();
+    let total = 0;
+    for (const i of rows) {
+        const subEventType = columns.sub_event_types[columns.set[i]];
+        sums.set(subEventType, (sums.get(subEventType) || 0) + columns.f[i]);
+        total += columns.f[i];
+    }
+    // group sub event types with less than 1% of the fatalities into 'Other'
+    const grouped = new Map();
+    for (const [subEventType, sum] of sums) {
+        const name = sum / total < 0.01 ? 'Other' : subEventType;
+        grouped.set(name, (grouped.get(name) || 0) + sum);
+    }
+    const names = [...grouped.keys()].sort((a, b) => grouped.get(b) - grouped.get(a));
+    return figure(columns, [{
+        type: 'pie',
+        labels: names,
+        values: names.map(name => grouped.get(name)),
+        marker: {colors: names.map(name => columns.sub_event_type_colors[name])},
+        hovertemplate: 'Sub Event Type=%{label}<br>Number of Fatalities=%{value}<extra></extra>',
+    }], {title: {text: 'Fatalities by Sub Event Type'}, legend: {tracegroupgap: 0}});
+}
+
+const MAP_HOVERTEMPLATE = (
+    '<b>🌍 Country:</b> %{customdata[1]}<br>' +
+    '<b>⚠️ Sub-Event-Type:</b> %{customdata[2]}<br>' +
+    '<b>📅 Date:</b> %{customdata[3]}<br>' +
+    '<b>👤 Actor 1:</b> %{customdata[4]}<br>' +
+    '<b>👤 Actor 2:</b> %{customdata[5]}<br>' +
+    '<b>🪦 Fatalities:</b> %{customdata[6]}<extra></extra>'
+);
+
+// Same color modes as `render_map`, the first custom data field is used by `update_notes`
+function scatterMap(columns, rows, colorMode) {
+    const actorName = code => code >= 0 ? columns.actors[code] : '';
+    const trace = (traceRows, marker) => ({
+        type: 'scattermap',
+        mode: 'markers',
+        lat: traceRows.map(i => columns.lat[i]),
+        lon: traceRows.map(i => columns.lon[i]),
+        customdata: traceRows.map(i => [
+            columns.id[i], columns.countries[columns.c[i]], columns.sub_event_types[columns.set[i]], formatDate(columns.t[i]),
+            actorName(columns.a1[i]), actorName(columns.a2[i]), columns.f[i],
+        ]),
+        marker: marker,
+        selected: {marker: {opacity: 1}},
+        unselected: {marker: {opacity: 1}},
+        hovertemplate: MAP_HOVERTEMPLATE,
+    });
+    const mean = values => rows.reduce((sum, i) => sum + values[i], 0) / (rows.length || 1);
+    const layout = {
+        map: {center: {lat: mean(columns.lat), lon: mean(columns.lon)}, zoom: 5},
+        height: 600,
+        margin: {t: 0, b: 0, l: 0, r: 0},
+        autosize: false,
+        clickmode: 'event+select',
+        // keeps the zoom and position of the map when the figure is updated
+        uirevision: 'map',
+    };
+
+    let traces;
+    if (colorMode === 'event_date' || colorMode === 'fatalities') {
+        const values = colorMode === 'event_date' ? columns.t : columns.f;
+        const marker = {color: rows.map(i => values[i]), coloraxis: 'coloraxis', opacity: 1};
+        if (colorMode === 'fatalities') {
+            const maxFatalities = rows.reduce((max, i) => Math.max(max, columns.f[i]), 0);
+            Object.assign(marker, {size: marker.color, sizemode: 'area', sizeref: maxFatalities / 400, opacity: 0.8});
+        }
+        traces = [trace(rows, marker)];
+        layout.coloraxis = {
+            colorscale: columns.colorscales[colorMode],
+            colorbar: {title: {text: colorMode === 'event_date' ? 'Event Date' : 'Fatalities'}},
+        };
+    } else {
+        const bySubEventType = colorMode === 'sub_event_type';
+        const codes = bySubEventType ? columns.set : columns.c;
+        const names = bySubEventType ? columns.sub_event_types : columns.countries;
+        const colors = bySubEventType ? columns.sub_event_type_colors : columns.country_colors;
+        const groups = new Map();
+        for (const i of rows) {
+            if (!groups.has(codes[i])) groups.set(codes[i], []);
+            groups.get(codes[i]).push(i);
+        }
+        traces = [...groups].map(([code, groupRows]) => Object.assign(
+            trace(groupRows, {color: colors[names[code]], opacity: 1}), {name: names[code], legendgroup: names[code]}
+        ));
+        layout.legend = {title: {text: bySubEventType ? 'sub_event_type' : 'country'}, tracegroupgap: 0};
+    }
+    return figure(columns, traces, layout);
+}
+
+// Same as `update_choropleth`, the browser loads the GeoJSON once from its URL
+function choroplethMap(columns, rows, eventType) {
+    const ukraine = columns.countries.indexOf('Ukraine');
+    const counts = new Map();
+    let hasEventType = false;
+    for (const i of rows) {
+        if (columns.c[i] !== ukraine) continue;
+        const admin1 = columns.admin1s[columns.ad[i]];
+        const matches = columns.event_types[columns.et[i]] === eventType;
+        counts.set(admin1, (counts.get(admin1) || 0) + (matches ? 1 : 0));
+        hasEventType = hasEventType || matches;
+    }
+    if (!hasEventType) {
+        return figure(columns, [], {});
+    }
+    const regions = [...counts.keys()].sort();
+    const values = regions.map(region => counts.get(region));
+    return figure(columns, [{
+        type: 'choroplethmap',
+        geojson: columns.geojson_url,
+        featureidkey: 'id',
+        locations: regions,
+        z: values,
+        coloraxis: 'coloraxis',
+        hovertemplate: `admin1=%{location}<br>${eventType}=%{z}<extra></extra>`,
+    }], {
+        coloraxis: {colorscale: columns.colorscales.choropleth, cmin: 0, cmax: Math.max(...values), colorbar: {title: {text: eventType}}},
+        map: {style: 'carto-positron', center: {lat: 49, lon: 32}, zoom: 3},
+        margin: {r: 0, t: 0, l: 0, b: 0},
+    });
+}
+
+// Number of events per sub event type and day, shared by the widgets below
+function subEventTypeCounts(columns, rows) {
+    const counts = new Map();
+    for (const i of rows) {
+        const subEventType = columns.sub_event_types[columns.set[i]];
+        if (!counts.has(subEventType)) counts.set(subEventType, new Map());
+        const byDate = counts.get(subEventType);
+        byDate.set(columns.t[i], (byDate.get(columns.t[i]) || 0) + 1);
+    }
+    return new Map([...counts.keys()].sort().map(subEventType => {
+        const byDate = counts.get(subEventType);
+        return [subEventType, new Map([...byDate.keys()].sort((a, b) => a - b).map(date => [date, byDate.get(date)]))];
+    }));
+}
+
+function subEventTypeLine(columns, counts) {
+    if (!counts.size) {
+        return figure(columns, [], {});
+    }
+    const dates = [...new Set([...counts.values()].flatMap(byDate => [...byDate.keys()]))].sort((a, b) => a - b);
+    const traces = [...counts].map(([subEventType, byDate]) => {
+        let total = 0;
+        return {
+            type: 'scatter',
+            mode: 'lines',
+            stackgroup: '1',
+            name: subEventType,
+            x: dates.map(formatDate),
+            y: dates.map(date => (total += byDate.get(date) || 0)),
+            line: {color: columns.sub_event_type_colors[subEventType]},
+            hovertemplate: `Sub Event Type=${subEventType}<br>Date=%{x}<br>Number of Events=%{y}<extra></extra>`,
+        };
+    });
+    return figure(columns, traces, {
+        title: {text: 'Cumulative Events by Sub Event Type Over Time'},
+        legend: {title: {text: 'Sub Event Type'}},
+        xaxis: {title: {text: 'Date'}},
+        yaxis: {title: {text: 'Number of Events'}},
+    });
+}
+
+function eventsOverTime(columns, counts) {
+    const traces = [...counts].map(([subEventType, byDate]) => ({
+        type: 'scatter',
+        mode: 'lines',
+        name: subEventType,
+        x: [...byDate.keys()].map(formatDate),
+        y: [...byDate.values()],
+        line: {color: columns.sub_event_type_colors[subEventType]},
+        hovertemplate: `Sub Event Type=${subEventType}<br>Date=%{x}<br>Number of Events=%{y}<extra></extra>`,
+    }));
+    return figure(columns, traces, {
+        title: {text: 'Events Over Time'},
+        legend: {title: {text: 'sub_event_type'}},
+        xaxis: {title: {text: 'Date'}},
+        yaxis: {title: {text: 'Number of Events'}},
+    });
+}
+
+function eventsOverTime3d(columns, counts) {
+    const traces = [...counts].map(([subEventType, byDate]) => ({
+        type: 'scatter3d',
+        mode: 'lines',
+        name: subEventType,
+        x: [...byDate.keys()].map(formatDate),
+        y: Array(byDate.size).fill(subEventType),
+        z: [...byDate.values()],
+        line: {color: columns.sub_event_type_colors[subEventType]},
+        hovertemplate: 'Date=%{x}<br>Sub Event Type=%{y}<br>Number of Events=%{z}<extra></extra>',
+    }));
+    return figure(columns, traces, {
+        title: {text: 'Events Over Time 3D'},
+        legend: {title: {text: 'sub_event_type'}},
+        scene: {
+            xaxis: {title: {text: 'Date'}},
+            yaxis: {title: {text: 'Sub Event Type'}},
+            zaxis: {title: {text: 'Number of Events'}},
+        },
+    });
+}
+
+// Counts the individual sources of the selected events, like `update_events_by_source`
+function eventsBySource(columns, rows, topN) {
+    const selected = new Uint8Array(columns.t.length);
+    for (const i of rows) selected[i] = 1;
+
+    const counts = new Map();
+    const totals = new Map();
+    for (let j = 0; j < columns.sr.length; j++) {
+        const row = columns.sr[j];
+        if (!selected[row]) continue;
+        const source = columns.sc[j];
+        const subEventType = columns.sub_event_types[columns.set[row]];
+        if (!counts.has(subEventType)) counts.set(subEventType, new Map());
+        const bySource = counts.get(subEventType);
+        bySource.set(source, (bySource.get(source) || 0) + 1);
+        totals.set(source, (totals.get(source) || 0) + 1);
+    }
+    const topSources = [...totals.keys()].sort((a, b) => totals.get(b) - totals.get(a)).slice(0, topN);
+
+    const traces = [...counts.keys()].sort().map(subEventType => {
+        const bySource = counts.get(subEventType);
+        const sources = topSources.filter(source => bySource.has(source));
+        return {
+            type: 'bar',
+            name: subEventType,
+            x: sources.map(source => columns.sources[source]),
+            y: sources.map(source => bySource.get(source)),
+            marker: {color: columns.sub_event_type_colors[subEventType]},
+            hovertemplate: `Sub Event Type=${subEventType}<br>Source=%{x}<br>Number of Events=%{y}<extra></extra>`,
+        };
+    }).filter(trace => trace.x.length);
+    return figure(columns, traces, {
+        title: {text: `Top ${topN} Reporting Sources and Sub Event Types`},
+        barmode: 'stack',
+        legend: {title: {text: 'Sub Event Type'}},
+        xaxis: {title: {text: 'Source'}, categoryorder: 'array', categoryarray: topSources.map(source => columns.sources[source])},
+        yaxis: {title: {text: 'Number of Events'}},
+    });
+}
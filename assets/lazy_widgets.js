@@ -0,0 +1,36 @@
+// Reports the widgets which are scrolled into view to the `visible-widgets` store, see `update_lazy_widgets`.
+(function() {
+    const visibleWidgets = new Set();
+
+    const intersectionObserver = new IntersectionObserver(entries => {
+        let changed = false;
+        for (const entry of entries) {
+            const widgetId = entry.target.dataset.widget;
+            if (entry.isIntersecting && !visibleWidgets.has(widgetId)) {
+                visibleWidgets.add(widgetId);
+                changed = true;
+            } else if (!entry.isIntersecting && visibleWidgets.has(widgetId)) {
+                visibleWidgets.delete(widgetId);
+                changed = true;
+            }
+        }
+        if (changed) {
+            window.dash_clientside.set_props('visible-widgets', {data: [...visibleWidgets].sort()});
+        }
+    // start rendering shortly before a widget enters the viewport
+    }, {rootMargin: '200px 0px'});
+
+    // the widgets are created by Dash after the page has loaded, observe them as soon as they appear.
+    // The layout is static, so all widgets exist together with `#main-plots` and the DOM is not watched any longer.
+    const mutationObserver = new MutationObserver(() => {
+        const mainPlots = document.getElementById('main-plots');
+        if (!mainPlots) {
+            return;
+        }
+        for (const widget of mainPlots.querySelectorAll('.lazy-widget')) {
+            intersectionObserver.observe(widget);
+        }
+        mutationObserver.disconnect();
+    });
+    mutationObserver.observe(document.documentElement, {childList: true, subtree: true});
+})();
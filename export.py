@@ -0,0 +1,143 @@
+# Render dashboard figures and aggregated tables without starting the Dash server, e.g.
+# `python export.py export_configs.json --output exports --formats html png --tables csv`
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import app
+
+# Defaults match the initial state of the dashboard controls
+DEFAULT_CONFIG = {
+    'name': 'default',
+    'dataset': app.default_file,
+    'start': None,
+    'end': None,
+    'include_non_fatal': True,
+    'actor_filter': 'ukraine|russia',
+    'search': '',
+    'countries': [],
+    'map_color_mode': app.color_modes[0],
+    'choropleth_event_type': None,
+    'top_sources': app.TOP_SOURCES_SHOWN,
+}
+
+FIGURE_FORMATS = ['html', 'png', 'svg', 'pdf']
+TABLE_FORMATS = ['csv', 'parquet']
+
+
+def build_figures(config: dict) -> dict:
+    """
+    Renders all figures of the dashboard from `app.data_filtered`, by the id of their `dcc.Graph`.
+    """
+    figures = {
+        'map': app.render_map(config['map_color_mode']),
+        # exported files are opened without the server, so they need to contain the GeoJSON
+        'choropleth-map': app.update_choropleth(config['choropleth_event_type'], embed_geojson=True),
+    }
+    for widget_id in app.widget_builders:
+        figures[widget_id] = app.render_widget(widget_id, config['top_sources'])
+    return figures
+
+
+def aggregate_tables() -> dict[str, pd.DataFrame]:
+    """
+    Computes the aggregates behind the widgets from `app.data_filtered`.
+    """
+    data_filtered = app.data_filtered
+    source_counts = app.count_events_by_source()
+    return {
+        'fatalities_per_day': data_filtered.groupby('event_date')['fatalities'].sum().reset_index(),
+        'events_per_day': data_filtered.groupby(['event_date', 'sub_event_type']).size().reset_index(name='count'),
+        'events_by_event_type': data_filtered.groupby(['event_type', 'sub_event_type']).size().reset_index(name='count'),
+        'fatalities_by_sub_event_type': data_filtered.groupby('sub_event_type')['fatalities'].sum().reset_index(),
+        'events_by_region': data_filtered.groupby(['country', 'admin1', 'event_type']).size().reset_index(name='count'),
+        'events_by_source': app.events_by_source_table(source_counts, np.flatnonzero(source_counts.sum(axis=1))),
+    }
+
+
+def export_config(config: dict, output_dir: str, figure_formats: list[str], table_formats: list[str]) -> str:
+    """
+    Filters the data like the dashboard controls described by `config` and writes all figures and tables.
+    Runs in a worker process, which keeps the dataset it loaded last in `app.data`.
+    """
+    config = {**DEFAULT_CONFIG, **config}
+    app.ensure_dataset(config['dataset'])
+
+    start = int(pd.Timestamp(config['start']).timestamp()) if config['start'] else int(app.data['event_date_i'].min())
+    end = int(pd.Timestamp(config['end']).timestamp()) if config['end'] else int(app.data['event_date_i'].max())
+    bool_options = ['Include Non-Fatal Events'] if config['include_non_fatal'] else []
+    app.filter_data([start, end], bool_options, config['actor_filter'], config['search'], config['countries'])
+    if config['choropleth_event_type'] is None:
+        config['choropleth_event_type'] = app.data['event_type'].unique()[0]
+
+    target_dir = os.path.join(output_dir, config['name'])
+    os.makedirs(target_dir, exist_ok=True)
+
+    for widget_id, fig in build_figures(config).items():
+        for figure_format in figure_formats:
+            path = os.path.join(target_dir, f'{widget_id}.{figure_format}')
+            if figure_format == 'html':
+                fig.write_html(path, include_plotlyjs='cdn')
+            else:
+                # static images need the optional `kaleido` package
+                fig.write_image(path)
+
+    for table_name, table in aggregate_tables().items():
+        for table_format in table_formats:
+            path = os.path.join(target_dir, f'{table_name}.{table_format}')
+            if table_format == 'csv':
+                table.to_csv(path, index=False)
+            else:
+                # parquet needs the optional `pyarrow` package
+                table.to_parquet(path, index=False)
+
+    return target_dir
+
+
+def load_configs(config_file: str | None) -> list[dict]:
+    if config_file is None:
+        return [DEFAULT_CONFIG]
+    with open(config_file, 'r') as f:
+        configs = json.load(f)
+    if isinstance(configs, dict):
+        configs = [configs]
+    names = [config.get('name') for config in configs]
+    if None in names or len(set(names)) != len(names):
+        raise ValueError('Every filter configuration needs a unique "name", it is used as output directory.')
+    for config in configs:
+        top_sources = config.get('top_sources', DEFAULT_CONFIG['top_sources'])
+        if isinstance(top_sources, bool) or not isinstance(top_sources, int) or top_sources < 1:
+            raise ValueError(f'"top_sources" of {config["name"]} has to be a positive integer, got {top_sources!r}.')
+    return configs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the dashboard figures and aggregated tables for a list of filter configurations.')
+    parser.add_argument('config_file', nargs='?', help='JSON file with a list of filter configurations, see DEFAULT_CONFIG for the keys')
+    parser.add_argument('--output', default='exports', help='output directory, one subdirectory per configuration')
+    parser.add_argument('--formats', nargs='+', choices=FIGURE_FORMATS, default=['html'], help='figure formats')
+    parser.add_argument('--tables', nargs='*', choices=TABLE_FORMATS, default=['csv'], help='table formats')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--verbose', action='store_true', help='print debug output of the dashboard functions')
+    args = parser.parse_args()
+
+    app.debug = args.verbose
+    configs = load_configs(args.config_file)
+
+    # group configurations of the same dataset, so workers rarely have to load another one
+    configs = sorted(configs, key=lambda config: config.get('dataset', app.default_file))
+    # load the first dataset before starting the workers, so they inherit it instead of each loading it
+    app.ensure_dataset(configs[0].get('dataset', app.default_file))
+    with ProcessPoolExecutor(max_workers=min(args.processes, len(configs))) as executor:
+        futures = {
+            executor.submit(export_config, config, args.output, args.formats, args.tables): config['name']
+            for config in configs
+        }
+        for future in as_completed(futures):
+            print(f'Exported {futures[future]} to {future.result()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+# Production server configuration, run with `gunicorn app:server`
+import multiprocessing
+import os
+
+# read by app.py: disables debug output and dev tools, enables response compression
+os.environ.setdefault('PRODUCTION', '1')
+
+bind = '0.0.0.0:8050'
+workers = multiprocessing.cpu_count()
+# import app.py once in the master process, see `when_ready` below
+preload_app = True
+# callbacks on large datasets can take a while
+timeout = 120
+
+
+def when_ready(server):
+    # app.py only loads the dataset on first use, load the default dataset once in the master process
+    # before the workers are started, so they share it copy-on-write instead of each loading it again
+    import app
+    app.ensure_dataset(app.default_file)
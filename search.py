@@ -0,0 +1,98 @@
+import re
+import numpy as np
+import pandas as pd
+
+# fields covered by the full-text search, with the weight a match in that field adds to the score
+SEARCH_FIELDS = {
+    'notes': 1.0,
+    'actor1': 2.0,
+    'actor2': 2.0,
+    'location': 2.0,
+    'source': 1.0,
+}
+
+# query terms shorter than this are matched exactly instead of as a prefix,
+# a single letter prefix would otherwise pull in a large part of the vocabulary
+MIN_PREFIX_LENGTH = 2
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def build_search_index(data: pd.DataFrame) -> dict:
+    """
+    Builds an inverted index over the `SEARCH_FIELDS` of `data`.
+    The postings are stored as flat arrays sorted by token, so all tokens sharing
+    a prefix occupy one contiguous slice which can be found with a binary search.
+    Row numbers in the index are positions in `data`, not index labels.
+    """
+    tokens, rows, weights = [], [], []
+    for field, weight in SEARCH_FIELDS.items():
+        if field not in data.columns:
+            continue
+        column = data[field].reset_index(drop=True)
+        field_tokens = column.fillna('').astype(str).str.lower().str.findall(TOKEN_PATTERN).explode().dropna()
+        tokens.append(field_tokens.to_numpy())
+        rows.append(field_tokens.index.to_numpy(dtype=np.int64))
+        weights.append(np.full(len(field_tokens), weight))
+
+    size = len(data)
+    stride = max(size, 1)
+    tokens = np.concatenate(tokens) if tokens else np.array([], dtype=object)
+    rows = np.concatenate(rows) if rows else np.array([], dtype=np.int64)
+    weights = np.concatenate(weights) if weights else np.array([])
+
+    # sort the postings by (token, row) using integer keys, then merge repeated tokens within a row
+    codes, vocabulary = pd.factorize(tokens, sort=True)
+    keys = codes.astype(np.int64) * stride + rows
+    order = np.argsort(keys, kind='stable')
+    keys, weights = keys[order], weights[order]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    weights = np.add.reduceat(weights, np.flatnonzero(first)) if len(keys) else weights
+    keys = keys[first]
+
+    vocabulary = np.asarray(vocabulary, dtype=str)
+    document_frequency = np.bincount(keys // stride, minlength=len(vocabulary))
+    offsets = np.concatenate([[0], np.cumsum(document_frequency)])
+    idf = np.log(1 + size / np.maximum(document_frequency, 1))
+
+    return {
+        'size': size,
+        'vocabulary': vocabulary,
+        'offsets': offsets,
+        'rows': keys % stride,
+        # weight of each posting, already multiplied with the idf of its token
+        'weights': weights * np.repeat(idf, document_frequency),
+    }
+
+
+def search(index: dict, query: str) -> np.ndarray:
+    """
+    Returns the relevance score of every row for `query`, rows which do not match score 0.
+    Every term of the query has to match (prefix match for terms of at least `MIN_PREFIX_LENGTH` characters).
+    """
+    scores = np.zeros(index['size'])
+    terms = tokenize(query)
+    if not terms:
+        return scores
+
+    vocabulary = index['vocabulary']
+    matches = np.ones(index['size'], dtype=bool)
+    for term in terms:
+        lo = np.searchsorted(vocabulary, term, side='left')
+        if len(term) >= MIN_PREFIX_LENGTH:
+            hi = np.searchsorted(vocabulary, term + '\uffff', side='left')
+        else:
+            hi = lo + 1 if lo < len(vocabulary) and vocabulary[lo] == term else lo
+
+        start, end = index['offsets'][lo], index['offsets'][hi]
+        term_scores = np.bincount(index['rows'][start:end], weights=index['weights'][start:end], minlength=index['size'])
+        matches &= term_scores > 0
+        scores += term_scores
+
+    scores[~matches] = 0
+    return scores